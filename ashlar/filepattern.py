@@ -106,7 +106,7 @@ class FilePatternReader(reg.Reader):
         )
 
     def read(self, series, c):
-        path = str(self.path / self.filename(series, c))
+        path = str(self.tile_path(series, c))
         kwargs = {}
         if self.metadata.multi_channel_tiles:
             kwargs['key'] = c
@@ -120,3 +120,6 @@ class FilePatternReader(reg.Reader):
         row, col = self.metadata.tile_rc(series)
         return self.pattern.format(row=row, col=col, channel=c)
 
+    def tile_path(self, series, c):
+        return self.path / self.filename(series, c)
+
@@ -180,7 +180,7 @@ class FileSeriesReader(reg.PlateReader):
     def read(self, series, c):
         # TODO: Address tension between non-plate and plate-aware modes
         # here and in Metadata class.
-        path = str(self.path / self.metadata.filename(series, c))
+        path = str(self.tile_path(series, c))
         kwargs = {}
         if self.metadata.multi_channel_tiles:
             kwargs['key'] = c
@@ -189,3 +189,6 @@ class FileSeriesReader(reg.PlateReader):
             # processing code only handles 2D image arrays!
             kwargs['key'] = 0
         return skimage.io.imread(path, **kwargs)
+
+    def tile_path(self, series, c):
+        return self.path / self.metadata.filename(series, c)
@@ -1,3 +1,4 @@
+import os
 import sys
 import warnings
 import re
@@ -6,6 +7,10 @@ import io
 import uuid
 import struct
 import pathlib
+import collections
+import functools
+import threading
+import concurrent.futures
 import jnius_config
 import numpy as np
 import scipy.spatial.distance
@@ -78,7 +83,7 @@ class Metadata(object):
     @property
     def grid_dimensions(self):
         pos = self.positions
-        shape = np.array([len(set(pos[:, d])) for d in range(2)])
+        shape = np.array([np.unique(pos[:, d]).size for d in range(2)])
         if np.prod(shape) != self.num_images:
             raise ValueError("Series positions do not form a grid")
         return shape
@@ -90,21 +95,34 @@ class Metadata(object):
     @property
     def positions(self):
         if not hasattr(self, '_positions'):
-            self._positions = np.vstack([
-                self.tile_position(i) for i in range(self._num_images)
-            ])
+            self._positions = self._tile_positions()
         return self._positions
 
+    def _tile_positions(self):
+        # Subclasses may override this to obtain all positions more efficiently
+        # than one tile_position call per tile.
+        positions = np.empty((self._num_images, 2))
+        for i in range(self._num_images):
+            positions[i] = self.tile_position(i)
+        return positions
+
     @property
     def size(self):
         if not hasattr(self, '_size'):
-            s0 = self.tile_size(0)
-            image_ids = range(1, self._num_images)
-            if any(any(self.tile_size(i) != s0) for i in image_ids):
+            sizes = self._tile_sizes()
+            if (sizes != sizes[0]).any():
                 raise ValueError("Image series must all have the same dimensions")
-            self._size = s0
+            self._size = sizes[0]
         return self._size
 
+    def _tile_sizes(self):
+        # Subclasses may override this to obtain all sizes more efficiently
+        # than one tile_size call per tile.
+        sizes = np.empty((self._num_images, 2), dtype=int)
+        for i in range(self._num_images):
+            sizes[i] = self.tile_size(i)
+        return sizes
+
     @property
     def centers(self):
         return self.positions + self.size / 2
@@ -174,7 +192,12 @@ class PlateMetadata(Metadata):
 
     @Metadata.positions.getter
     def positions(self):
-        return Metadata.positions.fget(self)[self.active_series]
+        positions = Metadata.positions.fget(self)
+        if self.active_plate is None:
+            # All series are active, so the cached array can be returned as-is
+            # rather than copied on every access.
+            return positions
+        return positions[self.active_series]
 
     # FIXME Metadata.grid_dimensions should be overriden here or removed.
 
@@ -184,6 +207,10 @@ class Reader(object):
     def read(self, series, c):
         raise NotImplementedError
 
+    def tile_path(self, series, c):
+        """Return the path of the file that `read` loads the image from."""
+        raise NotImplementedError
+
 
 class PlateReader(Reader):
     # No API here, just a way to signal that a subclass's metadata class
@@ -201,6 +228,18 @@ class BioformatsMetadata(PlateMetadata):
 
     _ome_dtypes = {v: k for k, v in _pixel_dtypes.items()}
 
+    # Conversion factors to micrometers for the OME length units we expect to
+    # see in stage positions.
+    _length_units = {
+        'm': 1e6,
+        'cm': 1e4,
+        'mm': 1e3,
+        '\u00b5m': 1.0,
+        'nm': 1e-3,
+        'pm': 1e-6,
+        '\u00c5': 1e-4,
+    }
+
     def __init__(self, path):
         super(BioformatsMetadata, self).__init__()
         self.path = path
@@ -375,6 +414,57 @@ class BioformatsMetadata(PlateMetadata):
         position_pixels = position_microns / self.pixel_size
         return position_pixels
 
+    def _tile_positions(self):
+        # Querying positions through MetadataRetrieve costs several JNI round
+        # trips per tile, which adds up on large mosaics. Instead we take them
+        # from the OME-XML tree we already parsed, mirroring the unit handling
+        # and fallbacks in tile_position. If we encounter a unit we don't know
+        # how to convert, we defer to the Bio-Formats implementation.
+        root = self._omexml_root
+        ns = root.tag[:root.tag.index('}') + 1] if root.tag[0] == '{' else ''
+        images = root.findall(ns + 'Image')[:self._num_images]
+        positions = np.empty((len(images), 2))
+        for i, image in enumerate(images):
+            plane = image.find(ns + 'Pixels/' + ns + 'Plane')
+            values = []
+            for dim in ('Y', 'X'):
+                if plane is None or plane.get('Position' + dim) is None:
+                    warn_data(
+                        "Stage coordinates undefined; falling back to (0, 0)."
+                    )
+                    values = [0.0, 0.0]
+                    break
+                value = float(plane.get('Position' + dim))
+                unit = plane.get('Position%sUnit' % dim, 'reference frame')
+                if unit in self._length_units:
+                    value *= self._length_units[unit]
+                elif unit in ('reference frame', 'pixel'):
+                    warn_data(
+                        "Stage coordinates' measurement unit is undefined;"
+                        " assuming \u03BCm."
+                    )
+                else:
+                    return super()._tile_positions()
+                values.append(value)
+            positions[i] = values
+        # Invert Y so that stage position coordinates and image pixel
+        # coordinates are aligned (most formats seem to work this way).
+        positions *= [-1, 1]
+        positions /= self.pixel_size
+        return positions
+
+    def _tile_sizes(self):
+        # As with _tile_positions, read the sizes from the OME-XML tree in one
+        # pass instead of two MetadataRetrieve calls per tile.
+        root = self._omexml_root
+        ns = root.tag[:root.tag.index('}') + 1] if root.tag[0] == '{' else ''
+        images = root.findall(ns + 'Image')[:self._num_images]
+        sizes = np.empty((len(images), 2), dtype=int)
+        for i, image in enumerate(images):
+            pixels = image.find(ns + 'Pixels')
+            sizes[i] = [int(pixels.get('SizeY')), int(pixels.get('SizeX'))]
+        return sizes
+
     def tile_size(self, i):
         values = []
         for dim in ('Y', 'X'):
@@ -400,27 +490,75 @@ class BioformatsReader(PlateReader):
         img = np.frombuffer(byte_array.tostring(), dtype=dtype).reshape(shape)
         return img
 
+    def tile_path(self, series, c):
+        return self.path
+
 
 class CachingReader(Reader):
-    """Wraps a reader to provide tile image caching."""
+    """Wraps a reader to provide tile image caching.
 
-    def __init__(self, reader, channel):
+    Only images from `channel` are cached. If `max_size` is not None, at most
+    that many images are kept and the least recently used one is evicted first.
+    Reads are serialized so the wrapped reader (and its underlying Bio-Formats
+    reader object, if any) is never accessed from two threads at once.
+
+    """
+
+    def __init__(self, reader, channel, max_size=None):
         self.reader = reader
         self.channel = channel
-        self._cache = {}
+        self.max_size = max_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     @property
     def metadata(self):
         return self.reader.metadata
 
+    def tile_path(self, series, c):
+        return self.reader.tile_path(series, c)
+
     def read(self, series, c):
-        if c == self.channel and series in self._cache:
-            img = self._cache[series]
-        else:
-            img = self.reader.read(series, c)
-        if c == self.channel and series not in self._cache:
-            self._cache[series] = img
-        return img
+        with self._lock:
+            if c != self.channel:
+                return self.reader.read(series, c)
+            try:
+                img = self._cache[series]
+                self._cache.move_to_end(series)
+            except KeyError:
+                img = self.reader.read(series, c)
+                self._cache[series] = img
+                if self.max_size is not None:
+                    while len(self._cache) > self.max_size:
+                        self._cache.popitem(last=False)
+            return img
+
+
+def _detach_jvm_after(func):
+    """Wrap func to detach the calling thread from the JVM when it returns.
+
+    pyjnius attaches any thread that calls into Java to the JVM automatically,
+    but the thread must be detached again before it exits. Work run on a
+    thread pool may read tiles through Bio-Formats, so it must go through this
+    wrapper. Detaching a thread that never attached is harmless.
+
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            jnius.detach()
+    return wrapper
 
 
 # TileStatistics = collections.namedtuple(
@@ -455,10 +593,18 @@ class EdgeAligner(object):
 
     def __init__(
         self, reader, channel=0, max_shift=15, false_positive_ratio=0.01,
-        randomize=False, filter_sigma=0.0, do_make_thumbnail=True, verbose=False
+        randomize=False, filter_sigma=0.0, do_make_thumbnail=True,
+        cache_size=None, max_workers=None, backend='numpy', cache_path=None,
+        verbose=False
     ):
         self.channel = channel
-        self.reader = CachingReader(reader, self.channel)
+        # The default unbounded cache holds every tile of the alignment channel,
+        # which is what we want as long as they fit in memory. With a bounded
+        # cache, something on the order of two grid rows keeps all neighbors of
+        # the current tile resident during register_all. compute_threshold
+        # samples strips from random tile pairs though, so it will still decode
+        # some tiles more than once (fewer the larger the cache; see there).
+        self.reader = CachingReader(reader, self.channel, max_size=cache_size)
         self.verbose = verbose
         # Unit is micrometers.
         self.max_shift = max_shift
@@ -467,6 +613,22 @@ class EdgeAligner(object):
         self.randomize = randomize
         self.filter_sigma = filter_sigma
         self.do_make_thumbnail = do_make_thumbnail
+        # Number of threads for pairwise registration; None lets
+        # ThreadPoolExecutor choose based on the CPU count.
+        self.max_workers = max_workers
+        # Array backend for phase correlation, see utils.get_backend.
+        self.backend = backend
+        # Optional file for saving the error threshold sample and pairwise
+        # registration results so a re-run on the same input can skip them,
+        # see _cache_key.
+        if cache_path is not None:
+            try:
+                reader.tile_path(0, channel)
+            except NotImplementedError:
+                raise ValueError(
+                    "cache_path requires a reader that implements tile_path"
+                ) from None
+        self.cache_path = cache_path
         self._cache = {}
 
     neighbors_graph = neighbors_graph
@@ -492,11 +654,10 @@ class EdgeAligner(object):
         # neighbors_graph max_distance calculation and ensuring the graph is
         # fully connected.
         pos = self.metadata.positions
-        overlaps = np.array([
-            self.metadata.size - abs(pos[t1] - pos[t2])
-            for t1, t2 in self.neighbors_graph.edges
-        ])
-        failures = np.any(overlaps < 1, axis=1) if len(overlaps) else []
+        edges = np.array(list(self.neighbors_graph.edges), dtype=int)
+        edges = edges.reshape(-1, 2)
+        overlaps = self.metadata.size - abs(pos[edges[:, 0]] - pos[edges[:, 1]])
+        failures = np.any(overlaps < 1, axis=1)
         if len(failures) and all(failures):
             warn_data("No tiles overlap, attempting alignment anyway.")
         elif any(failures):
@@ -526,6 +687,14 @@ class EdgeAligner(object):
         # possible truly distinct strips with fewer tiles. The calculation here
         # is just a heuristic, not rigorously derived.
         n = 1000 if num_distant_pairs > 8 else (num_distant_pairs + 1) * 10
+        if self.cache_path is not None and not self.randomize:
+            errors = self._saved_results['errors_negative_sampled']
+            if errors is not None:
+                self.errors_negative_sampled = errors
+                self.max_error = np.percentile(
+                    errors, self.false_positive_ratio * 100
+                )
+                return
         pairs = np.empty((n, 2), dtype=int)
         offsets = np.empty((n, 2), dtype=int)
         # Generate n random non-overlapping image strips. Strips are always
@@ -565,36 +734,182 @@ class EdgeAligner(object):
                 )
             pairs[i] = t1, t2
             offsets[i] = o1, o2
-        errors = np.empty(n)
-        for i, ((t1, t2), (offset1, offset2)) in enumerate(zip(pairs, offsets)):
-            if self.verbose and (i % 10 == 9 or i == n - 1):
-                sys.stdout.write(
-                    '\r    quantifying alignment error %d/%d' % (i + 1, n)
-                )
-                sys.stdout.flush()
+        def register_strips(args):
+            (t1, t2), (offset1, offset2) = args
             img1 = self.reader.read(t1, self.channel)[offset1:offset1+w, :]
             img2 = self.reader.read(t2, self.channel)[offset2:offset2+w, :]
-            _, errors[i] = utils.register(img1, img2, self.filter_sigma, upsample=1)
+            _, error = utils.register(
+                img1, img2, self.filter_sigma, upsample=1, backend=self.backend
+            )
+            return error
+        # The strips come from random tiles, which would thrash a bounded tile
+        # cache. In that case we visit them in blocks of tiles instead: split
+        # the tiles into groups of half the cache size and register the strips
+        # for one pair of groups at a time, snaking through the second group
+        # index so consecutive group pairs share a group. The errors are still
+        # stored in the original random order.
+        order = np.arange(n)
+        if self.reader.max_size is not None:
+            group = np.sort(pairs, axis=1) // max(self.reader.max_size // 2, 1)
+            snake = np.where(group[:, 0] % 2, -group[:, 1], group[:, 1])
+            order = np.lexsort((snake, group[:, 0]))
+        errors = np.empty(n)
+        # Tile reads may call into the JVM from the worker threads, see
+        # _detach_jvm_after.
+        register_strips = _detach_jvm_after(register_strips)
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [
+                pool.submit(register_strips, (pairs[i], offsets[i]))
+                for i in order
+            ]
+            try:
+                for i, (j, future) in enumerate(zip(order, futures)):
+                    if self.verbose and (i % 10 == 9 or i == n - 1):
+                        sys.stdout.write(
+                            '\r    quantifying alignment error %d/%d'
+                            % (i + 1, n)
+                        )
+                        sys.stdout.flush()
+                    errors[j] = future.result()
+            finally:
+                # If we were interrupted, don't make the pool's shutdown wait
+                # for all of the queued work.
+                for future in futures:
+                    future.cancel()
         if self.verbose:
             print()
+        # A randomized sample isn't saved, since a later non-randomized run
+        # wouldn't reproduce it.
+        if self.cache_path is not None and not self.randomize:
+            self._saved_results['errors_negative_sampled'] = errors
+            self._save_results()
         self.errors_negative_sampled = errors
         self.max_error = np.percentile(errors, self.false_positive_ratio * 100)
 
     def register_all(self):
-        n = self.neighbors_graph.size()
-        for i, (t1, t2) in enumerate(self.neighbors_graph.edges, 1):
-            if self.verbose:
-                sys.stdout.write('\r    aligning edge %d/%d' % (i, n))
-                sys.stdout.flush()
-            self.register_pair(t1, t2)
+        # Pairs are registered in parallel threads. The FFTs and most of the
+        # array math release the GIL, and tile reads go through the
+        # thread-safe CachingReader. We work through the pairs in tile order,
+        # which sweeps across the grid row by row and keeps the set of tiles in
+        # use small when the tile cache is bounded. Results are stored in edge
+        # order though, so the contents of _cache don't depend on traversal or
+        # thread scheduling.
+        keys = [tuple(sorted(e)) for e in self.neighbors_graph.edges]
+        results = {}
+        if self.cache_path is not None:
+            results.update(self._saved_results['pairs'])
+        todo = sorted(
+            k for k in keys if k not in self._cache and k not in results
+        )
+        n = len(todo)
+        # Tile reads may call into the JVM from the worker threads, see
+        # _detach_jvm_after.
+        register_edge = _detach_jvm_after(self._register_edge)
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [pool.submit(register_edge, *k) for k in todo]
+            try:
+                for i, (key, future) in enumerate(zip(todo, futures), 1):
+                    if self.verbose:
+                        sys.stdout.write('\r    aligning edge %d/%d' % (i, n))
+                        sys.stdout.flush()
+                    results[key] = future.result()
+            finally:
+                # If we were interrupted partway, cancel the pairs that haven't
+                # started, let the ones in progress finish and keep those that
+                # succeeded. Then save whatever we got.
+                for future in futures:
+                    future.cancel()
+                concurrent.futures.wait(futures)
+                for key, future in zip(todo, futures):
+                    if (
+                        key not in results and not future.cancelled()
+                        and future.exception() is None
+                    ):
+                        results[key] = future.result()
+                if n and self.cache_path is not None:
+                    self._saved_results['pairs'] = results
+                    self._save_results()
         if self.verbose:
             print()
+        for key in keys:
+            if key in results and key not in self._cache:
+                self._cache[key] = results[key]
         self.all_errors = np.array([x[1] for x in self._cache.values()])
         # Set error values above the threshold to infinity.
         for k, v in self._cache.items():
             if v[1] > self.max_error or any(np.abs(v[0]) > self.max_shift_pixels):
                 self._cache[k] = (v[0], np.inf)
 
+    def _cache_key(self):
+        # Saved results are only valid for the same input, tile positions and
+        # registration parameters, including the backend since they don't all
+        # give identical shifts. We recognize the same input by the latest
+        # modification time among the files the tiles are read from, so
+        # rewriting any one tile invalidates the cache. The error threshold
+        # and max_shift are applied after the fact so they don't matter here.
+        paths = {
+            str(self.reader.tile_path(i, self.channel))
+            for i in range(self.metadata.num_images)
+        }
+        mtime_ns = max(os.stat(p).st_mtime_ns for p in paths)
+        return dict(
+            mtime_ns=mtime_ns, channel=self.channel,
+            filter_sigma=self.filter_sigma, backend=self.backend,
+            positions=self.metadata.positions,
+        )
+
+    @property
+    def _saved_results(self):
+        # The key is computed once, when the cache is loaded, and saved along
+        # with the results. If an input file changes during the run the cache
+        # will then be considered stale next time.
+        if not hasattr(self, '_saved'):
+            key = self._cache_key()
+            saved = dict(key=key, pairs={}, errors_negative_sampled=None)
+            if os.path.exists(self.cache_path):
+                with np.load(self.cache_path) as data:
+                    if all(
+                        k in data.files and np.array_equal(data[k], v)
+                        for k, v in key.items()
+                    ):
+                        saved['pairs'] = {
+                            tuple(pair): (shift, error)
+                            for pair, shift, error in zip(
+                                data['pairs'].tolist(), data['shifts'],
+                                data['errors']
+                            )
+                        }
+                        if 'errors_negative_sampled' in data.files:
+                            saved['errors_negative_sampled'] = (
+                                data['errors_negative_sampled']
+                            )
+                    elif self.verbose:
+                        print("    ignoring stale registration cache %s"
+                              % self.cache_path)
+            self._saved = saved
+        return self._saved
+
+    def _save_results(self):
+        saved = self._saved_results
+        results = saved['pairs']
+        arrays = dict(saved['key'])
+        arrays['pairs'] = np.array(list(results), dtype=int).reshape(-1, 2)
+        arrays['shifts'] = np.array(
+            [r[0] for r in results.values()]
+        ).reshape(-1, 2)
+        arrays['errors'] = np.array(
+            [r[1] for r in results.values()], dtype=float
+        )
+        errors_negative_sampled = saved['errors_negative_sampled']
+        if errors_negative_sampled is not None:
+            arrays['errors_negative_sampled'] = errors_negative_sampled
+        # Write to a temporary file and rename, so an interruption can't leave
+        # a truncated cache behind.
+        tmp_path = '%s.tmp' % self.cache_path
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.cache_path)
+
     def build_spanning_tree(self):
         # Note that this may be disconnected, so it's technically a forest.
         g = nx.Graph()
@@ -666,34 +981,38 @@ class EdgeAligner(object):
         try:
             shift, error = self._cache[key]
         except KeyError:
-            # We test a series of increasing overlap window sizes to help avoid
-            # missing alignments when the stage position error is large relative
-            # to the tile overlap. Simply using a large overlap in all cases
-            # limits the maximum achievable correlation thus increasing the
-            # error metric, leading to worse overall results. The window size
-            # starts at the nominal size and doubles until it's at least 10% of
-            # the tile size. If the nominal overlap is already 10% or greater,
-            # we only use that one size.
-            smin = self.intersection(key[0], key[1]).shape
-            smax = np.round(self.metadata.size * 0.1)
-            sizes = [smin]
-            while any(sizes[-1] < smax):
-                sizes.append(sizes[-1] * 2)
-            results = [self._register(key[0], key[1], s) for s in sizes]
-            # Use the shift from the window size that gave the lowest error.
-            shift, _ = min(results, key=lambda r: r[1])
-            # Extract the images from the nominal overlap window but with the
-            # shift applied to the second tile's position, and compute the error
-            # metric on these images. This should be even lower than the error
-            # computed above.
-            _, o1, o2 = self.overlap(key[0], key[1], shift=shift)
-            error = utils.nccw(o1, o2, self.filter_sigma)
+            shift, error = self._register_edge(*key)
             self._cache[key] = (shift, error)
         if t1 > t2:
             shift = -shift
         # Return copy of shift to prevent corruption of cached values.
         return shift.copy(), error
 
+    def _register_edge(self, t1, t2):
+        # We test a series of increasing overlap window sizes to help avoid
+        # missing alignments when the stage position error is large relative
+        # to the tile overlap. Simply using a large overlap in all cases
+        # limits the maximum achievable correlation thus increasing the
+        # error metric, leading to worse overall results. The window size
+        # starts at the nominal size and doubles until it's at least 10% of
+        # the tile size. If the nominal overlap is already 10% or greater,
+        # we only use that one size.
+        smin = self.intersection(t1, t2).shape
+        smax = np.round(self.metadata.size * 0.1)
+        sizes = [smin]
+        while any(sizes[-1] < smax):
+            sizes.append(sizes[-1] * 2)
+        results = [self._register(t1, t2, s) for s in sizes]
+        # Use the shift from the window size that gave the lowest error.
+        shift, _ = min(results, key=lambda r: r[1])
+        # Extract the images from the nominal overlap window but with the
+        # shift applied to the second tile's position, and compute the error
+        # metric on these images. This should be even lower than the error
+        # computed above.
+        _, o1, o2 = self.overlap(t1, t2, shift=shift)
+        error = utils.nccw(o1, o2, self.filter_sigma)
+        return shift, error
+
     def _register(self, t1, t2, min_size=0):
         its, img1, img2 = self.overlap(t1, t2, min_size)
         # Account for padding, flipping the sign depending on the direction
@@ -702,7 +1021,9 @@ class EdgeAligner(object):
         sx = 1 if p1[1] >= p2[1] else -1
         sy = 1 if p1[0] >= p2[0] else -1
         padding = its.padding * [sy, sx]
-        shift, error = utils.register(img1, img2, self.filter_sigma)
+        shift, error = utils.register(
+            img1, img2, self.filter_sigma, backend=self.backend
+        )
         shift += padding
         return shift, error
 
@@ -743,8 +1064,11 @@ class EdgeAligner(object):
         its, o1, o2 = self.overlap(t1, t2, min_size)
         w1 = utils.whiten(o1, self.filter_sigma)
         w2 = utils.whiten(o2, self.filter_sigma)
-        corr = scipy.fft.fftshift(np.abs(scipy.fft.ifft2(
-            scipy.fft.fft2(w1) * scipy.fft.fft2(w2).conj()
+        # The images are real, so the half-spectrum real FFT is sufficient.
+        corr = scipy.fft.fftshift(np.abs(scipy.fft.irfft2(
+            scipy.fft.rfft2(w1, workers=-1)
+            * scipy.fft.rfft2(w2, workers=-1).conj(),
+            s=w1.shape, workers=-1
         )))
         corr /= (np.linalg.norm(w1) * np.linalg.norm(w2))
         stack = np.vstack
@@ -781,7 +1105,7 @@ class EdgeAligner(object):
 class LayerAligner(object):
 
     def __init__(self, reader, reference_aligner, channel=None, max_shift=15,
-                 filter_sigma=0.0, verbose=False):
+                 filter_sigma=0.0, backend=None, verbose=False):
         self.reader = reader
         self.reference_aligner = reference_aligner
         if channel is None:
@@ -791,6 +1115,9 @@ class LayerAligner(object):
         self.max_shift = max_shift
         self.max_shift_pixels = self.max_shift / self.metadata.pixel_size
         self.filter_sigma = filter_sigma
+        if backend is None:
+            backend = reference_aligner.backend
+        self.backend = backend
         self.verbose = verbose
         # FIXME Still a bit muddled here on the use of metadata positions vs.
         # corrected positions from the reference aligner. We probably want to
@@ -890,7 +1217,9 @@ class LayerAligner(object):
         its, ref_img, img = self.overlap(t)
         if np.any(np.array(its.shape) == 0):
             return (0, 0), np.inf
-        shift, error = utils.register(ref_img, img, self.filter_sigma)
+        shift, error = utils.register(
+            ref_img, img, self.filter_sigma, backend=self.backend
+        )
         # We don't use padding and thus can skip the math to account for it.
         assert (its.padding == 0).all(), "Unexpected non-zero padding"
         return shift, error
@@ -923,8 +1252,11 @@ class LayerAligner(object):
         its, o1, o2 = self.overlap(t)
         w1 = utils.whiten(o1, self.filter_sigma)
         w2 = utils.whiten(o2, self.filter_sigma)
-        corr = scipy.fft.fftshift(np.abs(scipy.fft.ifft2(
-            scipy.fft.fft2(w1) * scipy.fft.fft2(w2).conj()
+        # The images are real, so the half-spectrum real FFT is sufficient.
+        corr = scipy.fft.fftshift(np.abs(scipy.fft.irfft2(
+            scipy.fft.rfft2(w1, workers=-1)
+            * scipy.fft.rfft2(w2, workers=-1).conj(),
+            s=w1.shape, workers=-1
         )))
         plt.figure()
         plt.subplot(1, 3, 1)
@@ -1058,6 +1390,9 @@ class Mosaic(object):
             self.dfp = self._load_single_profile(dfp_path, num_channels, img_size, 'dark')
             self.ffp = self._load_single_profile(ffp_path, num_channels, img_size, 'flat')
 
+            # An integer dark-field image can't be normalized in place.
+            if not np.issubdtype(self.dfp.dtype, np.floating):
+                self.dfp = self.dfp.astype(float)
             # FIXME This assumes integer dtypes. Do we need to support floats?
             self.dfp /= np.iinfo(self.dtype).max
             self.do_correction = True
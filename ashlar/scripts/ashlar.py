@@ -12,6 +12,9 @@ from ..fileseries import FileSeriesReader
 from ..zen import ZenReader
 
 
+REGISTRATION_CACHE_FILENAME = 'registration_cache.npz'
+
+
 def main(argv=sys.argv):
 
     parser = argparse.ArgumentParser(
@@ -92,6 +95,12 @@ def main(argv=sys.argv):
         help=('read dark field profile image from FILES; if specified must'
               ' be one common file for all cycles or one file for each cycle')
     )
+    parser.add_argument(
+        '--cache-registration', default=False, action='store_true',
+        help=('save the first cycle\'s tile registration results in the'
+              ' output directory and reuse them when re-run on unchanged'
+              ' input with the same alignment settings')
+    )
     parser.add_argument(
         '--plates', default=False, action='store_true',
         help='enable plate mode for HTS data'
@@ -174,14 +183,17 @@ def main(argv=sys.argv):
             return process_plates(
                 filepaths, output_path, args.filename_format, args.flip_x,
                 args.flip_y, ffp_paths, dfp_paths, aligner_args, mosaic_args,
-                args.pyramid, args.quiet
+                args.pyramid, args.quiet, args.cache_registration
             )
         else:
             mosaic_path_format = str(output_path / args.filename_format)
+            cache_path = None
+            if args.cache_registration:
+                cache_path = str(output_path / REGISTRATION_CACHE_FILENAME)
             return process_single(
                 filepaths, mosaic_path_format, args.flip_x, args.flip_y,
                 ffp_paths, dfp_paths, aligner_args, mosaic_args, args.pyramid,
-                args.quiet
+                args.quiet, cache_path
             )
     except ProcessingError as e:
         print_error(str(e))
@@ -190,7 +202,8 @@ def main(argv=sys.argv):
 
 def process_single(
     filepaths, mosaic_path_format, flip_x, flip_y, ffp_paths, dfp_paths,
-    aligner_args, mosaic_args, pyramid, quiet, plate_well=None
+    aligner_args, mosaic_args, pyramid, quiet, cache_path=None,
+    plate_well=None
 ):
 
     output_path_0 = format_cycle(mosaic_path_format, 0)
@@ -214,6 +227,8 @@ def process_single(
     ea_args = aligner_args.copy()
     if len(filepaths) == 1:
         ea_args['do_make_thumbnail'] = False
+    if cache_path is not None:
+        ea_args['cache_path'] = cache_path
     edge_aligner = reg.EdgeAligner(reader, **ea_args)
     edge_aligner.run()
     mshape = edge_aligner.mosaic_shape
@@ -261,7 +276,8 @@ def process_single(
 
 def process_plates(
     filepaths, output_path, filename_format, flip_x, flip_y, ffp_paths,
-    dfp_paths, aligner_args, mosaic_args, pyramid, quiet
+    dfp_paths, aligner_args, mosaic_args, pyramid, quiet,
+    cache_registration=False
 ):
 
     temp_reader = build_reader(filepaths[0])
@@ -279,10 +295,14 @@ def process_plates(
                 well_path = output_path / plate_name / well_name
                 well_path.mkdir(parents=True, exist_ok=True)
                 mosaic_path_format = str(well_path / filename_format)
+                cache_path = None
+                if cache_registration:
+                    # Each well gets its own cache in its output directory.
+                    cache_path = str(well_path / REGISTRATION_CACHE_FILENAME)
                 process_single(
                     filepaths, mosaic_path_format, flip_x, flip_y,
                     ffp_paths, dfp_paths, aligner_args, mosaic_args, pyramid,
-                    quiet, plate_well=(p, w)
+                    quiet, cache_path, plate_well=(p, w)
                 )
             else:
                 print("Skipping -- No images found.")
@@ -1,36 +1,80 @@
 import itertools
 import warnings
-import skimage.feature
 import skimage.io
-import skimage.restoration.uft
 import skimage.morphology
 import skimage.util
 import skimage.util.dtype
 import scipy.ndimage
 import scipy.fft
 import numpy as np
+import numba
 
 
-# Pre-calculate the Laplacian operator kernel. We'll always be using 2D images.
-_laplace_kernel = skimage.restoration.uft.laplacian(2, (3, 3))[1]
+@numba.njit(nogil=True, cache=True)
+def laplace(img):
+    """Apply the 3x3 Laplacian stencil [[0,-1,0],[-1,4,-1],[0,-1,0]].
+
+    Edges are handled like scipy.ndimage's 'reflect' mode, which for a radius-1
+    stencil is the same as clamping the neighbor indices. This is equivalent to
+    scipy.ndimage.convolve(img, kernel) but runs as a single pass. We release
+    the GIL so this can run concurrently from multiple threads.
+
+    """
+    h, w = img.shape
+    output = np.empty_like(img)
+    for y in range(h):
+        yp = max(y - 1, 0)
+        yn = min(y + 1, h - 1)
+        for x in range(w):
+            xp = max(x - 1, 0)
+            xn = min(x + 1, w - 1)
+            output[y, x] = (
+                4 * img[y, x] - img[yp, x] - img[yn, x] - img[y, xp]
+                - img[y, xn]
+            )
+    return output
+
 
 def whiten(img, sigma):
     img = skimage.img_as_float32(img)
     if sigma == 0:
-        output = scipy.ndimage.convolve(img, _laplace_kernel)
+        output = laplace(img)
     else:
         output = scipy.ndimage.gaussian_laplace(img, sigma)
     return output
 
 
-def register(img1, img2, sigma, upsample=10):
-    img1w = whiten(img1, sigma)
-    img2w = whiten(img2, sigma)
-    img1_f = scipy.fft.fft2(img1w)
-    img2_f = scipy.fft.fft2(img2w)
-    shift, _error, _phasediff = skimage.feature.register_translation(
-        img1_f, img2_f, upsample, 'fourier'
-    )
+def get_backend(name):
+    """Return the array module and FFT module for an array backend.
+
+    'numpy' runs on the CPU. 'cupy' runs the FFTs and correlation on a CUDA
+    GPU and requires the optional cupy package. 'opencv' uses numpy for the
+    array math but finds the peak with OpenCV's phaseCorrelate (see
+    phase_correlate_opencv) and requires the optional opencv package.
+
+    """
+    if name in ('numpy', 'opencv'):
+        return np, scipy.fft
+    elif name == 'cupy':
+        import cupy
+        import cupyx.scipy.fft
+        return cupy, cupyx.scipy.fft
+    else:
+        raise ValueError("backend must be 'numpy', 'cupy' or 'opencv'")
+
+
+def register(img1, img2, sigma, upsample=10, backend='numpy'):
+    xp, fft = get_backend(backend)
+    img1w = xp.asarray(whiten(img1, sigma))
+    img2w = xp.asarray(whiten(img2, sigma))
+    # OpenCV's Hann window requires both sides to be at least 2 pixels, so
+    # degenerate (e.g. 1-pixel-thick) overlaps go through our own correlator.
+    if backend == 'opencv' and min(img1w.shape) > 1:
+        shift = phase_correlate_opencv(img1w, img2w)
+    else:
+        img1_f = fft.fft2(img1w)
+        img2_f = fft.fft2(img2w)
+        shift = phase_correlate(img1_f, img2_f, upsample, backend)
     # At this point we may have a shift in the wrong quadrant since the FFT
     # assumes the signal is periodic. We test all four possibilities and return
     # the shift that gives the highest direct correlation (sum of products).
@@ -39,13 +83,12 @@ def register(img1, img2, sigma, upsample=10):
     shift_neg = shift_pos - shape
     shifts = list(itertools.product(*zip(shift_pos, shift_neg)))
     correlations = [
-        np.abs(np.sum(img1w * scipy.ndimage.shift(img2w, s, order=0)))
-        for s in shifts
+        abs(float(correlate_shifted(img1w, img2w, s))) for s in shifts
     ]
     idx = np.argmax(correlations)
     shift = shifts[idx]
     correlation = correlations[idx]
-    total_amplitude = np.linalg.norm(img1w) * np.linalg.norm(img2w)
+    total_amplitude = float(xp.linalg.norm(img1w) * xp.linalg.norm(img2w))
     if correlation > 0 and total_amplitude > 0:
         error = -np.log(correlation / total_amplitude)
     else:
@@ -53,6 +96,117 @@ def register(img1, img2, sigma, upsample=10):
     return shift, error
 
 
+def phase_correlate(src_freq, target_freq, upsample_factor=1, backend='numpy'):
+    """Return the translation registering two images given their 2D spectra.
+
+    This is the shift estimate from scikit-image's register_translation in
+    'fourier' space (the single-step DFT algorithm of Guizar-Sicairos et al.,
+    2008), written against an array backend so it can also run on the GPU. We
+    skip the RMS error and global phase calculations as register computes its
+    own error metric from the direct correlation.
+
+    """
+    xp, fft = get_backend(backend)
+    shape = np.array(src_freq.shape)
+    image_product = src_freq * target_freq.conj()
+    cross_correlation = fft.ifft2(image_product)
+    maxima = xp.unravel_index(
+        xp.argmax(xp.abs(cross_correlation)), cross_correlation.shape
+    )
+    shifts = np.array([int(m) for m in maxima], dtype=float)
+    midpoints = np.fix(shape / 2)
+    shifts[shifts > midpoints] -= shape[shifts > midpoints]
+    if upsample_factor > 1:
+        # Initial shift estimate in upsampled grid.
+        shifts = np.round(shifts * upsample_factor) / upsample_factor
+        upsampled_region_size = int(np.ceil(upsample_factor * 1.5))
+        # Center of output array at dftshift + 1.
+        dftshift = np.fix(upsampled_region_size / 2.0)
+        # Matrix multiply DFT around the current shift estimate.
+        sample_region_offset = dftshift - shifts * upsample_factor
+        cross_correlation = upsampled_dft(
+            image_product.conj(), upsampled_region_size, upsample_factor,
+            sample_region_offset, backend
+        ).conj()
+        maxima = xp.unravel_index(
+            xp.argmax(xp.abs(cross_correlation)), cross_correlation.shape
+        )
+        maxima = np.array([int(m) for m in maxima], dtype=float) - dftshift
+        shifts = shifts + maxima / upsample_factor
+    # If its only one row or column the shift along that dimension has no
+    # effect. We set it to zero.
+    shifts[shape == 1] = 0
+    return shifts
+
+
+def phase_correlate_opencv(img1, img2):
+    """Return the translation registering two images using OpenCV.
+
+    cv2.phaseCorrelate applies a Hann window, normalizes the cross-power
+    spectrum and refines the peak by a weighted centroid rather than an
+    upsampled DFT, so its sub-pixel precision is fixed and generally coarser
+    than phase_correlate with upsampling. The result uses the same sign and
+    axis conventions as phase_correlate.
+
+    """
+    import cv2
+    img1 = np.ascontiguousarray(img1, dtype=np.float32)
+    img2 = np.ascontiguousarray(img2, dtype=np.float32)
+    window = cv2.createHanningWindow(img1.shape[::-1], cv2.CV_32F)
+    (dx, dy), _response = cv2.phaseCorrelate(img1, img2, window)
+    # OpenCV reports the displacement of img2 relative to img1 as (x, y); the
+    # registering shift is the opposite of that, in (y, x) order.
+    return -np.array([dy, dx])
+
+
+def upsampled_dft(data, upsampled_region_size, upsample_factor, axis_offsets,
+                  backend='numpy'):
+    """Upsampled DFT of a region of a 2D spectrum by matrix multiplication.
+
+    Equivalent to zero-padding `data` by `upsample_factor`, taking the inverse
+    FFT and extracting a square region of `upsampled_region_size` starting at
+    `axis_offsets`, but much cheaper when the region is small.
+
+    """
+    xp, _ = get_backend(backend)
+    kernels = []
+    for n, offset in zip(data.shape, axis_offsets):
+        frequencies = xp.fft.fftfreq(n, upsample_factor)
+        samples = xp.arange(upsampled_region_size) - offset
+        kernel = xp.exp(-2j * np.pi * samples[:, None] * frequencies)
+        # Match the precision of the data (complex64 for our float32 images)
+        # so the products below stay in single precision. The phases are still
+        # computed in double precision.
+        kernels.append(kernel.astype(data.dtype, copy=False))
+    row_kernel, col_kernel = kernels
+    # Multiply the large data matrix by the short row kernel first so the
+    # intermediate result is only upsampled_region_size rows tall.
+    return (row_kernel @ data) @ col_kernel.T
+
+
+def correlate_shifted(img1, img2, shift):
+    """Return sum(img1 * scipy.ndimage.shift(img2, shift, order=0)).
+
+    Only the overlapping slices of the two images are multiplied, so the
+    shifted copy of img2 is never materialized. The bounds reproduce the
+    behavior of ndimage in 'constant' mode, which treats any sample coordinate
+    outside [0, n-1] as cval even when it would round to an edge pixel.
+
+    """
+    slices1 = []
+    slices2 = []
+    for n, s in zip(img1.shape, shift):
+        start = max(int(np.ceil(s)), 0)
+        stop = min(int(np.floor(n - 1 + s)) + 1, n)
+        if stop <= start:
+            return 0.0
+        # Source index for output index o is round-half-up(o - s).
+        offset = int(np.floor(0.5 - s))
+        slices1.append(slice(start, stop))
+        slices2.append(slice(start + offset, stop + offset))
+    return np.sum(img1[tuple(slices1)] * img2[tuple(slices2)])
+
+
 def nccw(img1, img2, sigma):
     img1w = whiten(img1, sigma)
     img2w = whiten(img2, sigma)
@@ -87,6 +241,8 @@ def crop(img, offset, shape):
 # - Trailing edge pixels should be zeroed to match the behavior of
 #   scipy.ndimage.shift, which we rely on in our maximum-intensity projection.
 def fourier_shift(img, shift):
+    import pyfftw
+    import pyfftw.builders
     # Ensure properly aligned complex64 data (fft requires complex to avoid
     # reallocation and copying).
     img = skimage.util.img_as_float32(img)
@@ -131,12 +287,8 @@ def paste(target, img, pos, func=None):
     pos_f, pos_i = np.modf(pos)
     yi, xi = pos_i.astype('i8')
     # Clip img to the edges of the mosaic.
-    if yi < 0:
-        img = img[-yi:]
-        yi = 0
-    if xi < 0:
-        img = img[:, -xi:]
-        xi = 0
+    img = img[max(-yi, 0):, max(-xi, 0):]
+    yi, xi = max(yi, 0), max(xi, 0)
     target_slice = target[yi:yi+img.shape[0], xi:xi+img.shape[1]]
     img = crop_like(img, target_slice)
     # Skip expensive sub-pixel shift if fractional position is zero.
@@ -159,6 +311,16 @@ def paste(target, img, pos, func=None):
         # Exit if image area is zero after subpixel shift.
         if not np.all(img.shape):
             return
+    if (
+        func is np.maximum and img.ndim == 2
+        and np.issubdtype(img.dtype, np.floating)
+        and np.issubdtype(target.dtype, np.unsignedinteger)
+    ):
+        # Fast path for maximum-intensity compositing of float images (e.g.
+        # thumbnails) into integer targets.
+        scale = img.dtype.type(np.iinfo(target.dtype).max)
+        _paste_maximum(target_slice, img, scale)
+        return
     if np.issubdtype(img.dtype, np.floating):
         np.clip(img, 0, 1, img)
     img = skimage.util.dtype.convert(img, target.dtype)
@@ -170,6 +332,29 @@ def paste(target, img, pos, func=None):
         target_slice[:] = func(target_slice, img)
 
 
+@numba.njit(nogil=True, cache=True)
+def _paste_maximum(target, img, scale):
+    """Convert float img to target's integer dtype and max-composite it.
+
+    This fuses the clip to [0, 1], the scaling and rounding performed by
+    skimage.util.dtype.convert and np.maximum into a single pass over img,
+    without allocating any temporaries. `scale` is the maximum value of the
+    target dtype, given in img's dtype so the arithmetic stays in that
+    precision just as it does in convert.
+
+    """
+    h, w = img.shape
+    for y in range(h):
+        for x in range(w):
+            v = np.rint(img[y, x] * scale)
+            if v > scale:
+                v = scale
+            # Negative values (which would clip to zero) and NaNs never pass
+            # this test since the target is unsigned.
+            if v > target[y, x]:
+                target[y, x] = v
+
+
 def pastefunc_blend(target, img):
     """Linear blend based on distance to unfilled space in target."""
     # This should catch actual holes but not the actual unfilled space.
@@ -186,11 +371,8 @@ def pastefunc_blend(target, img):
 
 
 def crop_like(img, target):
-    if (img.shape[0] > target.shape[0]):
-        img = img[:target.shape[0], :]
-    if (img.shape[1] > target.shape[1]):
-        img = img[:, :target.shape[1]]
-    return img
+    # Slicing past the end of an axis is a no-op, so no need to compare shapes.
+    return img[:target.shape[0], :target.shape[1]]
 
 
 def imsave(fname, arr, **kwargs):
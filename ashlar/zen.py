@@ -82,6 +82,9 @@ class ZenReader(reg.Reader):
         self.path = pathlib.Path(path)
 
     def read(self, series, c):
-        path = self.metadata.image_path(series, c)
+        path = self.tile_path(series, c)
         img = skimage.io.imread(str(path), key=0)
         return img
+
+    def tile_path(self, series, c):
+        return self.metadata.image_path(series, c)
@@ -13,6 +13,7 @@ requires = [
     'pyjnius>=1.2.1',
     'matplotlib>=3.1.2',
     'networkx>=2.4',
+    'numba>=0.48',
     'scipy>=1.4.1',
     # We require scikit-image's vendored old copy of tifffile -- see imsave in
     # ashlar/utils.py for details. They are un-vendoring it soon, so we're